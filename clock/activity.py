@@ -0,0 +1,268 @@
+import selectors
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from .local_db import LocalDatabase
+from .sync import create_table_operation, insert_operations, logged
+from .utils import get_last_clock_entry, get_table_name
+
+IDLE = "idle"
+ACTIVE = "active"
+
+
+class InputSource(ABC):
+    """Delivers input events to a callback until stopped."""
+
+    @abstractmethod
+    def start(self, callback) -> None:
+        """Starts calling callback for input events, without blocking."""
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stops delivering events and releases the devices."""
+
+
+class PynputSource(InputSource):
+    """Keyboard and mouse hooks through pynput (X11, Wayland via XWayland, macOS)."""
+
+    def __init__(self) -> None:
+        from pynput import keyboard, mouse
+
+        self._keyboard = keyboard
+        self._mouse = mouse
+        self._listeners = []
+
+    def start(self, callback) -> None:
+        on_event = lambda *args: callback()
+        self._listeners = [
+            self._keyboard.Listener(on_press=on_event),
+            self._mouse.Listener(
+                on_move=on_event, on_click=on_event, on_scroll=on_event
+            ),
+        ]
+        for listener in self._listeners:
+            listener.daemon = True
+            listener.start()
+
+    def stop(self) -> None:
+        for listener in self._listeners:
+            listener.stop()
+
+
+class EvdevSource(InputSource):
+    """Reads /dev/input directly, works without a display server."""
+
+    def __init__(self) -> None:
+        import evdev
+
+        self._devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
+        if not self._devices:
+            # list_devices() skips the ones we may not read, rather than failing.
+            raise PermissionError("no readable devices in /dev/input")
+        self._selector = selectors.DefaultSelector()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, callback) -> None:
+        for device in self._devices:
+            self._selector.register(device, selectors.EVENT_READ)
+        self._thread = threading.Thread(target=self._run, args=(callback,), daemon=True)
+        self._thread.start()
+
+    def _run(self, callback) -> None:
+        while not self._stopped.is_set():
+            # Blocks in the kernel until input arrives; the timeout only bounds stop().
+            for key, _ in self._selector.select(timeout=1):
+                try:
+                    # Drain the whole burst and report it as one event.
+                    for _ in key.fileobj.read():
+                        pass
+                except BlockingIOError:
+                    continue
+                callback()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._selector.close()
+
+
+class ReplaySource(InputSource):
+    """Replays synthetic event timestamps against a monitor, for testing."""
+
+    def __init__(self, timestamps: list[float]) -> None:
+        self.timestamps = sorted(timestamps)
+
+    def replay(self, monitor: "ActivityMonitor", until: float | None = None) -> None:
+        for timestamp in self.timestamps:
+            monitor.advance(timestamp)
+            monitor.record(timestamp)
+        if until is not None:
+            monitor.advance(until)
+        monitor.flush()
+
+    def start(self, callback) -> None:
+        for timestamp in self.timestamps:
+            callback(timestamp)
+
+    def stop(self) -> None:
+        pass
+
+
+class ActivityMonitor:
+    """Folds input events into per-minute buckets and reports idle/active transitions.
+
+    The event callback only bumps a counter, anything else happens when a minute
+    rolls over. Transitions are queued and handed to `on_flush` in batches, at most
+    `flush_after` seconds after the first one was queued.
+    """
+
+    def __init__(
+        self,
+        on_flush,
+        idle_after: int = 600,
+        flush_after: int = 300,
+        history_minutes: int = 60,
+    ) -> None:
+        self.on_flush = on_flush
+        self.idle_after = idle_after
+        self.flush_after = flush_after
+        self.history = deque(maxlen=history_minutes)
+        self.idle = False
+        self.pending = []
+        self._minute = None
+        self._count = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def record(self, timestamp: float | None = None) -> None:
+        minute = int((timestamp or time.time()) // 60)
+        # Listener threads call this while advance() may be going idle on another.
+        with self._lock:
+            if minute != self._minute:
+                self._roll(minute)
+            self._count += 1
+
+    def _roll(self, minute: int) -> None:
+        """Starts a new minute, called with the lock held."""
+        first = self._minute is None
+        if not first:
+            self.history.append((self._minute, self._count))
+        self._minute, self._count = minute, 0
+        if self.idle:
+            self.idle = False
+            self._queue(ACTIVE, minute)
+            self._wake.set()
+        elif first:
+            # run() has no idle deadline before the first event and sleeps unbounded.
+            self._wake.set()
+
+    def _queue(self, state: str, minute: int) -> None:
+        self.pending.append((state, datetime.fromtimestamp(minute * 60)))
+
+    def _idle_deadline(self) -> float | None:
+        if self.idle or self._minute is None:
+            return None
+        return (self._minute + 1) * 60 + self.idle_after
+
+    def advance(self, now: float) -> None:
+        """Detects idleness and flushes due transitions as of `now`."""
+        with self._lock:
+            deadline = self._idle_deadline()
+            if deadline is not None and now >= deadline:
+                self.idle = True
+                self._queue(IDLE, self._minute)
+            flush_due = self.pending and (
+                now - self.pending[0][1].timestamp() >= self.flush_after
+            )
+        if flush_due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            transitions, self.pending = self.pending, []
+        if transitions:
+            self.on_flush(transitions)
+
+    def _next_wakeup(self, now: float) -> float | None:
+        deadlines = [self._idle_deadline()]
+        if self.pending:
+            deadlines.append(self.pending[0][1].timestamp() + self.flush_after)
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return max(min(deadlines) - now, 0) if deadlines else None
+
+    def run(self, source: InputSource) -> None:
+        """Monitors until interrupted, sleeping until the next deadline in between."""
+        source.start(self.record)
+        try:
+            while True:
+                now = time.time()
+                self.advance(now)
+                self._wake.wait(self._next_wakeup(now))
+                self._wake.clear()
+        finally:
+            source.stop()
+            self.flush()
+
+
+class AutoClockOut:
+    """Flush handler clocking out when idle starts and back in when it ends."""
+
+    def __init__(self, config_dir: str) -> None:
+        self.config_dir = config_dir
+        self.resume_note = None
+
+    def _open_note(self, moment: datetime) -> str | None:
+        date = moment.strftime("%Y-%m-%d")
+        table_name = get_table_name(moment.month, moment.year)
+        last_entry = get_last_clock_entry(date, self.config_dir, table_name)
+        return last_entry[3] if last_entry and last_entry[2] == "in" else None
+
+    def __call__(self, transitions: list) -> None:
+        operations = []
+        unknown = object()
+        open_note = unknown
+        for state, moment in transitions:
+            table_name = get_table_name(moment.month, moment.year)
+            if state == IDLE:
+                if open_note is unknown:
+                    open_note = self._open_note(moment)
+                if open_note:
+                    action, note = "out", open_note
+                    self.resume_note, open_note = open_note, None
+                else:
+                    continue
+            elif self.resume_note:
+                action, note = "in", self.resume_note
+                self.resume_note, open_note = None, note
+            else:
+                continue
+            operations.append(create_table_operation(table_name))
+            operations += insert_operations(
+                table_name,
+                (moment.strftime("%Y-%m-%d"), moment.strftime("%H:%M"), action, note),
+            )
+        if operations:
+            with LocalDatabase.Database(
+                database_file=f"{self.config_dir}/database.db"
+            ) as db:
+                db.execute_transaction(logged("idle detection", operations))
+
+
+def get_source(name: str) -> InputSource:
+    """Builds an input source by name, "auto" tries pynput then evdev."""
+    match name:
+        case "pynput":
+            return PynputSource()
+        case "evdev":
+            return EvdevSource()
+        case "auto":
+            try:
+                return PynputSource()
+            except Exception:
+                return EvdevSource()
+        case _:
+            raise ValueError(f"Unknown input source: {name}")
@@ -0,0 +1,305 @@
+import hashlib
+import json
+import math
+from datetime import date, datetime, timedelta
+from fnmatch import fnmatchcase
+from typing import NamedTuple
+from .local_db import LocalDatabase
+from .sync import CHANGES_TABLE, TABLE_NAME_PATTERN
+
+RULES_TABLE = "billing_rules"
+CACHE_TABLE = "invoice_cache"
+# Cached months with no billable sessions still get a row, so they are not recomputed.
+EMPTY_MONTH_MARKER = ""
+# Bumped when billing itself changes, so months cached by older code are recomputed.
+CACHE_VERSION = 2
+
+
+class Rule(NamedTuple):
+    pattern: str
+    client: str
+    rate: float
+    increment: int = 1
+    minimum: int = 0
+    overtime_after: float = 0
+    overtime_multiplier: float = 1
+
+
+class LineItem(NamedTuple):
+    client: str
+    note: str
+    sessions: int
+    minutes: int
+    billed_minutes: int
+    overtime_minutes: int
+    amount: float
+
+
+def _rules_table_operation() -> tuple:
+    return (
+        f"""CREATE TABLE IF NOT EXISTS {RULES_TABLE} (
+            pattern TEXT PRIMARY KEY,
+            client TEXT,
+            rate REAL,
+            increment INTEGER,
+            minimum INTEGER,
+            overtime_after REAL,
+            overtime_multiplier REAL
+        )""",
+        (),
+    )
+
+
+def _cache_table_operation() -> tuple:
+    return (
+        f"""CREATE TABLE IF NOT EXISTS {CACHE_TABLE} (
+            month TEXT,
+            fingerprint TEXT,
+            client TEXT,
+            note TEXT,
+            sessions INTEGER,
+            minutes INTEGER,
+            billed_minutes INTEGER,
+            overtime_minutes INTEGER,
+            amount REAL
+        )""",
+        (),
+    )
+
+
+def set_rule(config_dir: str, rule: Rule) -> bool:
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        return db.execute_transaction(
+            [
+                _rules_table_operation(),
+                (f"INSERT OR REPLACE INTO {RULES_TABLE} VALUES (?,?,?,?,?,?,?)", rule),
+            ]
+        )
+
+
+def remove_rule(config_dir: str, pattern: str) -> bool:
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        return db.execute_transaction(
+            [
+                _rules_table_operation(),
+                (f"DELETE FROM {RULES_TABLE} WHERE pattern = ?", (pattern,)),
+            ]
+        )
+
+
+def get_rules(config_dir: str, db: LocalDatabase.Database | None = None) -> list:
+    if db is None:
+        with LocalDatabase.Database(
+            database_file=f"{config_dir}/database.db", read_only=True
+        ) as db:
+            return get_rules(config_dir, db)
+    rows = db.execute_query(f"SELECT * FROM {RULES_TABLE} ORDER BY pattern")
+    return [Rule(*row) for row in rows or []]
+
+
+def _rule_matcher(rules: list):
+    """Returns note -> Rule, preferring exact notes, then the longest glob pattern."""
+    exact = {rule.pattern: rule for rule in rules}
+    patterns = sorted(rules, key=lambda rule: len(rule.pattern), reverse=True)
+    resolved = {}
+
+    def match(note: str) -> Rule | None:
+        if note not in resolved:
+            resolved[note] = exact.get(note) or next(
+                (rule for rule in patterns if fnmatchcase(note, rule.pattern)), None
+            )
+        return resolved[note]
+
+    return match
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _month_key(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _read_rows(db: LocalDatabase.Database, start: date, end: date) -> list:
+    """All rows from start to end in one query ordered by date and time."""
+    wanted = set()
+    month = _month_start(start)
+    while month <= end:
+        wanted.add(f"data_{month.strftime('%Y_%m')}")
+        month = _next_month(month)
+    tables = sorted(
+        row[0]
+        for row in db.get_all_tables()
+        if TABLE_NAME_PATTERN.match(row[0]) and row[0] in wanted
+    )
+    if not tables:
+        return []
+    query = " UNION ALL ".join(
+        f"""SELECT '{table}', rowid, date, time, action, note FROM {table}
+            WHERE date BETWEEN ? AND ?""" for table in tables
+    )
+    params = (start.isoformat(), end.isoformat()) * len(tables)
+    # Ties within a minute keep insertion order, so an out followed by an in at the
+    # same time closes one session and opens the next, as in doctor.
+    rows = db.execute_query(f"{query} ORDER BY 3, 4, 1, 2", params) or []
+    return [tuple(row[2:]) for row in rows]
+
+
+def _bill(rows: list, match, months: set) -> dict:
+    """Pairs sessions per note in one pass and prices those starting in `months`.
+
+    Returns {month: {(client, note): [sessions, minutes, billed, overtime, amount]}}.
+    """
+    results = {month: {} for month in months}
+    open_sessions = {}
+    day_usage = {}  # (client, date) -> billed minutes so far, for overtime
+
+    for entry_date, entry_time, action, note in rows:
+        if action == "in":
+            open_sessions[note] = (entry_date, entry_time)
+            continue
+        if action != "out" or note not in open_sessions:
+            continue
+        in_date, in_time = open_sessions.pop(note)
+        month = in_date[:7]
+        rule = match(note)
+        if month not in results or rule is None:
+            continue
+        try:
+            started = datetime.strptime(f"{in_date} {in_time}", "%Y-%m-%d %H:%M")
+            ended = datetime.strptime(f"{entry_date} {entry_time}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            continue
+
+        minutes = max(int((ended - started).total_seconds() // 60), 0)
+        increment = max(rule.increment or 1, 1)
+        billed = max(math.ceil(minutes / increment) * increment, rule.minimum or 0)
+
+        overtime = 0
+        if rule.overtime_after:
+            used = day_usage.get((rule.client, in_date), 0)
+            regular = max(min(billed, rule.overtime_after * 60 - used), 0)
+            overtime = billed - regular
+            day_usage[(rule.client, in_date)] = used + billed
+        amount = (
+            rule.rate / 60 * (billed - overtime + overtime * rule.overtime_multiplier)
+        )
+
+        totals = results[month].setdefault((rule.client, note), [0, 0, 0, 0, 0.0])
+        totals[0] += 1
+        totals[1] += minutes
+        totals[2] += billed
+        totals[3] += overtime
+        totals[4] += amount
+    return results
+
+
+def _fingerprint(rules: list, version) -> str:
+    return hashlib.sha1(
+        json.dumps([CACHE_VERSION, rules, version]).encode()
+    ).hexdigest()
+
+
+def invoice(
+    config_dir: str, start: date, end: date, today: date | None = None
+) -> list[LineItem]:
+    """Bills every session starting between start and end, grouped per client and note.
+
+    Months that are closed (before the current one) and fully inside the range are
+    cached, keyed by the rules and the last change log sequence of the month and the
+    one after it, so editing either recomputes them.
+    """
+    today = today or date.today()
+    months = []
+    month = _month_start(start)
+    while month <= end:
+        months.append(month)
+        month = _next_month(month)
+
+    with LocalDatabase.Database(
+        database_file=f"{config_dir}/database.db", read_only=True
+    ) as db:
+        rules = get_rules(config_dir, db)
+        versions = dict(
+            db.execute_query(
+                f"SELECT table_name, MAX(seq) FROM {CHANGES_TABLE} GROUP BY table_name"
+            )
+            or []
+        )
+
+        cached, fingerprints = {}, {}
+        for month in months:
+            whole = start <= month and _next_month(month) <= end + timedelta(days=1)
+            closed = _next_month(month) <= _month_start(today)
+            if not (whole and closed):
+                continue
+            key = _month_key(month)
+            # Sessions open at the end of the month are closed in the next table.
+            fingerprints[key] = _fingerprint(
+                rules,
+                [
+                    versions.get(f"data_{day.strftime('%Y_%m')}")
+                    for day in (month, _next_month(month))
+                ],
+            )
+            rows = db.execute_query(
+                f"""SELECT client, note, sessions, minutes, billed_minutes,
+                    overtime_minutes, amount FROM {CACHE_TABLE}
+                    WHERE month = ? AND fingerprint = ?""",
+                (key, fingerprints[key]),
+            )
+            if rows:
+                cached[key] = {
+                    (client, note): list(values)
+                    for client, note, *values in rows
+                    if client != EMPTY_MONTH_MARKER
+                }
+
+        missing = [month for month in months if _month_key(month) not in cached]
+        computed = {}
+        if missing:
+            # One batch for every uncached month, plus a day for sessions past midnight.
+            rows = _read_rows(
+                db,
+                max(missing[0], start),
+                min(_next_month(missing[-1]), end + timedelta(days=1)),
+            )
+            computed = _bill(
+                [row for row in rows if row[0] <= end.isoformat() or row[2] == "out"],
+                _rule_matcher(rules),
+                {_month_key(month) for month in missing},
+            )
+
+    to_cache = [key for key in computed if key in fingerprints]
+    if to_cache:
+        operations = [_cache_table_operation()]
+        for key in to_cache:
+            operations.append((f"DELETE FROM {CACHE_TABLE} WHERE month = ?", (key,)))
+            lines = computed[key].items() or [
+                ((EMPTY_MONTH_MARKER, EMPTY_MONTH_MARKER), [0, 0, 0, 0, 0.0])
+            ]
+            for (client, note), values in lines:
+                operations.append(
+                    (
+                        f"INSERT INTO {CACHE_TABLE} VALUES (?,?,?,?,?,?,?,?,?)",
+                        (key, fingerprints[key], client, note, *values),
+                    )
+                )
+        with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+            db.execute_transaction(operations)
+
+    totals = {}
+    for per_month in (*cached.values(), *computed.values()):
+        for line, values in per_month.items():
+            line_totals = totals.setdefault(line, [0, 0, 0, 0, 0.0])
+            for i, value in enumerate(values):
+                line_totals[i] += value
+    return [
+        LineItem(client, note, *values[:4], round(values[4], 2))
+        for (client, note), values in sorted(totals.items())
+    ]
@@ -0,0 +1,242 @@
+import re
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from .local_db import LocalDatabase
+from .sync import (
+    TABLE_NAME_PATTERN,
+    create_table_operation,
+    delete_operations,
+    insert_operations,
+    logged,
+)
+
+DATE_PATTERN = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+TIME_PATTERN = re.compile(r"^\d{2}:\d{2}$")
+ACTIONS = ("in", "out", "task")
+LAST_MINUTE = "23:59"
+# SQLite's default SQLITE_MAX_COMPOUND_SELECT, about 41 years of monthly tables.
+MAX_UNION_TABLES = 500
+
+
+class Issue(NamedTuple):
+    kind: str
+    table: str
+    rowid: int
+    row: tuple
+    detail: str
+    fixable: bool
+
+
+def _table_for(date: str) -> str:
+    return f"data_{date[:4]}_{date[5:7]}"
+
+
+def _normalize(row: tuple) -> tuple | None:
+    """Returns the row with zero-padded date and time, or None if it can't be parsed."""
+    date, time, action, note = row
+    try:
+        date = datetime.strptime(date, "%Y-%m-%d").strftime("%Y-%m-%d")
+        time = datetime.strptime(time, "%H:%M").strftime("%H:%M")
+    except (TypeError, ValueError):
+        return None
+    if action not in ACTIONS:
+        return None
+    return (date, time, action, note)
+
+
+def _is_well_formed(row: tuple) -> bool:
+    date, time, action, _ = row
+    return (
+        isinstance(date, str)
+        and isinstance(time, str)
+        and DATE_PATTERN.match(date) is not None
+        and TIME_PATTERN.match(time) is not None
+        and action in ACTIONS
+        and _normalize(row) == row
+    )
+
+
+def _move_operations(table_name: str, row: tuple, new_row: tuple) -> list:
+    new_table = _table_for(new_row[0])
+    return delete_operations(table_name, row) + [
+        create_table_operation(new_table),
+        *insert_operations(new_table, new_row),
+    ]
+
+
+def _session_split_operations(open_in: tuple, table_name: str, out_row: tuple) -> list:
+    """Closes a session at 23:59 and reopens it at 00:00 on the next day.
+
+    The minute between the two goes to the end of the session, by moving the
+    clock-out a minute later (and into its own table), so the total stays the same.
+    Only a clock-out at 23:59 is left alone, and that session loses a minute.
+    """
+    in_date, note = open_in[2][0], open_in[2][3]
+    out_date, out_time = out_row[0], out_row[1]
+    operations = [
+        *insert_operations(_table_for(in_date), (in_date, LAST_MINUTE, "out", note)),
+        *insert_operations(_table_for(out_date), (out_date, "00:00", "in", note)),
+    ]
+    if out_time != LAST_MINUTE:
+        later = datetime.strptime(out_time, "%H:%M") + timedelta(minutes=1)
+        operations += _move_operations(
+            table_name, out_row, (out_date, later.strftime("%H:%M"), *out_row[2:])
+        )
+    return operations
+
+
+def scan(config_dir: str, today: str | None = None) -> tuple[list[Issue], list]:
+    """Checks every monthly table in one pass ordered by date and time.
+
+    Returns the issues found and the operations fixing the fixable ones, to be run
+    in a single transaction.
+    """
+    today = today or datetime.now().strftime("%Y-%m-%d")
+    with LocalDatabase.Database(
+        database_file=f"{config_dir}/database.db", read_only=True
+    ) as db:
+        tables = sorted(
+            row[0] for row in db.get_all_tables() if TABLE_NAME_PATTERN.match(row[0])
+        )
+        rows = []
+        # One UNION ALL query lets SQLite merge the months into a single ordered stream.
+        for start in range(0, len(tables), MAX_UNION_TABLES):
+            query = " UNION ALL ".join(
+                f"SELECT '{table}', rowid, date, time, action, note FROM {table}"
+                for table in tables[start : start + MAX_UNION_TABLES]
+            )
+            if query:
+                # Ties within a minute keep insertion order, so an out followed by
+                # an in at the same time stays a back-to-back pair of sessions.
+                rows += db.execute_query(f"{query} ORDER BY 3, 4, 1, 2") or []
+
+    issues, operations = [], []
+    previous = None
+    open_ins = {}  # note -> (table, rowid, row) of each open session, latest last
+    # (date, time, note) of every clock-out, so a resumed session is never dropped.
+    closing = {
+        (date, time, note) for _, _, date, time, action, note in rows if action == "out"
+    }
+
+    for table_name, rowid, *values in rows:
+        row = tuple(values)
+
+        if not _is_well_formed(row):
+            fixed = _normalize(row)
+            issues.append(
+                Issue(
+                    "malformed",
+                    table_name,
+                    rowid,
+                    row,
+                    "bad date, time or action",
+                    bool(fixed),
+                )
+            )
+            if fixed:
+                operations += _move_operations(table_name, row, fixed)
+            continue
+
+        if row == previous:
+            issues.append(
+                Issue("duplicate", table_name, rowid, row, "identical row", True)
+            )
+            operations += delete_operations(table_name, row)
+            continue
+        previous = row
+
+        date, time, action, note = row
+        if action == "in":
+            if open_ins:
+                _, open_rowid, open_row = (
+                    open_ins.get(note) or list(open_ins.values())[-1]
+                )
+                # A repeated clock-in for the same note and day is just redundant,
+                # unless that note is also clocked out at the same minute.
+                same_note = (
+                    open_row[3] == note
+                    and open_row[0] == date
+                    and (date, time, note) not in closing
+                )
+                since = f"{open_row[0]} {open_row[1]} (row {open_rowid})"
+                issues.append(
+                    Issue(
+                        "double-in",
+                        table_name,
+                        rowid,
+                        row,
+                        f"already clocked in since {since}",
+                        same_note,
+                    )
+                )
+                if same_note:
+                    operations += delete_operations(table_name, row)
+                    continue
+            open_ins.pop(note, None)
+            open_ins[note] = (table_name, rowid, row)
+        elif action == "out":
+            # Close the session for this note, or the latest one if none matches.
+            open_in = open_ins.pop(note, None)
+            if open_in is None and open_ins:
+                open_in = open_ins.pop(list(open_ins)[-1])
+            if open_in is None:
+                issues.append(
+                    Issue(
+                        "unmatched-out",
+                        table_name,
+                        rowid,
+                        row,
+                        "no open clock-in",
+                        False,
+                    )
+                )
+                continue
+            in_date = open_in[2][0]
+            if in_date != date:
+                next_day = (
+                    datetime.strptime(in_date, "%Y-%m-%d") + timedelta(days=1)
+                ).strftime("%Y-%m-%d")
+                kind = (
+                    "month-span"
+                    if _table_for(in_date) != _table_for(date)
+                    else "midnight-span"
+                )
+                fixable = next_day == date
+                detail = f"session started on {in_date}"
+                if fixable and row[1] == LAST_MINUTE:
+                    detail += ", splitting it at midnight drops one minute"
+                issues.append(Issue(kind, table_name, rowid, row, detail, fixable))
+                if fixable:
+                    operations += _session_split_operations(open_in, table_name, row)
+                    if row[1] != LAST_MINUTE:
+                        # The clock-out was moved into its own table already.
+                        continue
+
+        if _table_for(date) != table_name:
+            issues.append(
+                Issue(
+                    "misfiled",
+                    table_name,
+                    rowid,
+                    row,
+                    f"belongs in {_table_for(date)}",
+                    True,
+                )
+            )
+            operations += _move_operations(table_name, row, row)
+
+    for table_name, rowid, row in open_ins.values():
+        if row[0] != today:
+            issues.append(
+                Issue(
+                    "unmatched-in", table_name, rowid, row, "never clocked out", False
+                )
+            )
+
+    return issues, operations
+
+
+def fix(config_dir: str, operations: list) -> bool:
+    """Applies the operations returned by scan in one transaction."""
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        return db.execute_transaction(logged("doctor --fix", operations))
@@ -0,0 +1,71 @@
+from .local_db import LocalDatabase
+from .sync import (
+    CHANGES_TABLE,
+    OPERATIONS_TABLE,
+    changes_table_operation,
+    create_table_operation,
+    delete_operations,
+    drop_table_operations,
+    insert_operations,
+    operations_table_operation,
+)
+
+
+def _replay(config_dir: str, undo: bool) -> tuple[str | None, bool]:
+    """Reverts the latest operation, or reapplies the latest undone one.
+
+    Only the changes logged for that operation are touched, in one transaction.
+    Returns its description (None when there is nothing to do) and whether it worked.
+    """
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        db.execute_transaction(
+            [changes_table_operation(), operations_table_operation()]
+        )
+        if undo:
+            query = f"""SELECT op_id, description, from_seq, to_seq FROM {OPERATIONS_TABLE}
+                WHERE state = 'done' ORDER BY op_id DESC LIMIT 1"""
+        else:
+            query = f"""SELECT op_id, description, from_seq, to_seq FROM {OPERATIONS_TABLE}
+                WHERE state = 'undone' ORDER BY op_id ASC LIMIT 1"""
+        found = db.execute_query(query)
+        if not found:
+            return None, True
+        op_id, description, from_seq, to_seq = found[0]
+
+        changes = (
+            db.execute_query(
+                f"""SELECT table_name, op, date, time, action, note FROM {CHANGES_TABLE}
+                WHERE seq > ? AND seq <= ? ORDER BY seq""",
+                (from_seq, to_seq),
+            )
+            or []
+        )
+        operations = []
+        for table_name, op, *row in reversed(changes) if undo else changes:
+            if op == "drop":
+                operations += (
+                    [create_table_operation(table_name)]
+                    if undo
+                    else drop_table_operations(table_name)
+                )
+            # Undoing swaps every insert for a delete and the other way around.
+            elif (op == "insert") != undo:
+                operations.append(create_table_operation(table_name))
+                operations += insert_operations(table_name, tuple(row))
+            else:
+                operations += delete_operations(table_name, tuple(row))
+        operations.append(
+            (
+                f"UPDATE {OPERATIONS_TABLE} SET state = ? WHERE op_id = ?",
+                ("undone" if undo else "done", op_id),
+            )
+        )
+        return description, db.execute_transaction(operations)
+
+
+def undo(config_dir: str) -> tuple[str | None, bool]:
+    return _replay(config_dir, undo=True)
+
+
+def redo(config_dir: str) -> tuple[str | None, bool]:
+    return _replay(config_dir, undo=False)
@@ -0,0 +1,154 @@
+import fcntl
+import json
+import os
+import pathlib
+import uuid
+from .local_db import LocalDatabase
+from .sync import create_table_operation, insert_operations, logged
+
+JOURNAL_FILE = "journal.jsonl"
+COMPACTING_SUFFIX = ".compacting"
+BATCHES_TABLE = "journal_batches"
+
+
+def is_journal_mode() -> bool:
+    """Whether writes should go to the journal instead of the database."""
+    return os.environ.get("CXZ_WRITE_MODE", "direct").lower() == "journal"
+
+
+def _data_dir(config_dir: str) -> pathlib.Path:
+    return pathlib.Path(config_dir) / "data"
+
+
+def append_event(
+    config_dir: str, table_name: str, date: str, time: str, action: str, note: str
+) -> None:
+    """Append a single entry to the journal and fsync it to disk."""
+    line = json.dumps(
+        {
+            "table": table_name,
+            "date": date,
+            "time": time,
+            "action": action,
+            "note": note,
+        }
+    )
+    fd = _lock_journal(
+        _data_dir(config_dir) / JOURNAL_FILE, os.O_RDWR | os.O_APPEND | os.O_CREAT
+    )
+    try:
+        # Terminate a torn line left by a crash, so it can't swallow this entry.
+        size = os.fstat(fd).st_size
+        if size and os.pread(fd, 1, size - 1) != b"\n":
+            line = "\n" + line
+        os.write(fd, (line + "\n").encode())
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _lock_journal(path: pathlib.Path, flags: int) -> int:
+    """Opens the journal and takes an exclusive lock, released when it is closed.
+
+    If compaction renamed the file while we waited for the lock, the descriptor
+    points at a batch and we retry on the new journal instead.
+    """
+    while True:
+        fd = os.open(path, flags, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def _read_journal_file(path: pathlib.Path) -> list[dict]:
+    entries = []
+    try:
+        with open(path, "r") as journal:
+            for line in journal:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn trailing line left behind by a crash mid-write.
+                    continue
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _pending_files(config_dir: str) -> list[pathlib.Path]:
+    data_path = _data_dir(config_dir)
+    files = sorted(data_path.glob(f"*{COMPACTING_SUFFIX}"))
+    if (data_path / JOURNAL_FILE).exists():
+        files.append(data_path / JOURNAL_FILE)
+    return files
+
+
+def read_pending(config_dir: str, table_name: str | None = None) -> list[tuple]:
+    """Returns journaled rows not yet compacted, optionally for a single table."""
+    rows = []
+    for path in _pending_files(config_dir):
+        for entry in _read_journal_file(path):
+            if table_name is None or entry.get("table") == table_name:
+                rows.append(
+                    (entry["date"], entry["time"], entry["action"], entry["note"])
+                )
+    return rows
+
+
+def compact(config_dir: str) -> int:
+    """Move journaled entries into the database, returns the number of rows moved.
+
+    The journal is renamed under its lock to a uniquely named batch file before it
+    is read, so new writes keep landing in a fresh journal. The batch id is stored
+    in the same transaction as its rows, which makes re-running after a crash a no-op.
+    """
+    data_path = _data_dir(config_dir)
+    journal_path = data_path / JOURNAL_FILE
+    try:
+        fd = _lock_journal(journal_path, os.O_RDONLY)
+    except FileNotFoundError:
+        pass
+    else:
+        # Renamed under the lock, so no writer can append to the batch afterwards.
+        try:
+            journal_path.rename(data_path / f"{uuid.uuid4().hex}{COMPACTING_SUFFIX}")
+        finally:
+            os.close(fd)
+
+    batches = sorted(data_path.glob(f"*{COMPACTING_SUFFIX}"))
+    if not batches:
+        return 0
+
+    moved = 0
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        db.create_table(BATCHES_TABLE, ["batch_id TEXT PRIMARY KEY"])
+        for batch in batches:
+            batch_id = batch.name[: -len(COMPACTING_SUFFIX)]
+            if db.execute_query(
+                f"SELECT 1 FROM {BATCHES_TABLE} WHERE batch_id = ?", (batch_id,)
+            ):
+                batch.unlink()
+                continue
+
+            entries = _read_journal_file(batch)
+            operations = [
+                create_table_operation(table)
+                for table in sorted({entry["table"] for entry in entries})
+            ]
+            for entry in entries:
+                # Logged one by one, so undo steps back a single entry as in direct mode.
+                row = (entry["date"], entry["time"], entry["action"], entry["note"])
+                operations += logged(
+                    f"{row[2]} '{row[3]}' at {row[0]} {row[1]}",
+                    insert_operations(entry["table"], row),
+                )
+            operations.append((f"INSERT INTO {BATCHES_TABLE} VALUES (?)", (batch_id,)))
+            if not db.execute_transaction(operations):
+                break
+            batch.unlink()
+            moved += len(entries)
+    return moved
@@ -1,13 +1,19 @@
 import sqlite3
 import logging
+import pathlib
 
 LOGGER = logging.Logger(__name__)
 LOGGER.setLevel(logging.CRITICAL)
 
+READ_ONLY_MMAP_SIZE = 256 * 1024 * 1024
+
 
 class Database:
-    def __init__(self, database_file: str = "database.db") -> None:
+    def __init__(
+        self, database_file: str = "database.db", read_only: bool = False
+    ) -> None:
         self.database_file = database_file
+        self.read_only = read_only
         self.conn = None
         self.cursor = None
 
@@ -19,13 +25,38 @@ class Database:
         self.close_connection()
 
     def connect(self):
+        if self.read_only:
+            self.connect_snapshot()
+            return
         try:
             self.conn = sqlite3.connect(self.database_file)
+            # WAL lets snapshot readers and a writer work side by side.
+            self.conn.execute("PRAGMA journal_mode = WAL")
             self.cursor = self.conn.cursor()
             LOGGER.info("Connected to database")
         except sqlite3.Error as e:
             LOGGER.critical(f"Connection failed with error: {e}")
 
+    def connect_snapshot(self):
+        """Opens a read-only connection holding one read transaction until closed.
+
+        Every query then sees the same snapshot of the database, however many are
+        made, and no write lock is ever taken. Later connect() calls reuse it.
+        """
+        if self.conn is not None:
+            return
+        try:
+            uri = f"{pathlib.Path(self.database_file).resolve().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+            self.conn.execute(f"PRAGMA mmap_size = {READ_ONLY_MMAP_SIZE}")
+            self.conn.execute("BEGIN")
+            # BEGIN is deferred, the first read is what pins the snapshot.
+            self.conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            self.cursor = self.conn.cursor()
+            LOGGER.info("Connected to database snapshot")
+        except sqlite3.Error as e:
+            LOGGER.critical(f"Connection failed with error: {e}")
+
     def execute_query(self, query: str, params: tuple = None):
         try:
             if params:
@@ -37,21 +68,27 @@ class Database:
             LOGGER.error("Error executing the query:", error)
             return None
 
-    def commit_changes(self):
+    def execute_transaction(self, operations: list) -> bool:
+        """Run a list of (query, params) pairs atomically, all or nothing."""
         try:
-            self.conn.commit()
+            if self.conn is None:
+                self.connect()
+            with self.conn:
+                # Explicit BEGIN so DDL statements are part of the transaction too.
+                self.conn.execute("BEGIN")
+                for query, params in operations:
+                    self.conn.execute(query, params or ())
+            LOGGER.info(f"Committed transaction of {len(operations)} operations")
+            return True
         except sqlite3.Error as error:
-            LOGGER.error("Error committing the changes:", error)
+            LOGGER.error(f"Error executing transaction: {error}")
+            return False
 
-    def close_connection(self):
+    def commit_changes(self):
         try:
-            if self.cursor is not None:
-                self.cursor.close()
-            if self.conn is not None:
-                self.conn.close()
-            LOGGER.info("SQLite connection is closed.")
+            self.conn.commit()
         except sqlite3.Error as error:
-            LOGGER.error("Error closing the SQLite connection:", error)
+            LOGGER.error("Error committing the changes:", error)
 
     def close_connection(self):
         try:
@@ -59,6 +96,7 @@ class Database:
                 self.cursor.close()
             if self.conn is not None:
                 self.conn.close()
+            self.conn, self.cursor = None, None
             LOGGER.info("SQLite connection is closed.")
         except sqlite3.Error as error:
             LOGGER.error("Error closing the SQLite connection:", error)
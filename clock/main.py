@@ -1,3 +1,4 @@
+import json
 import os
 import pathlib
 from importlib import metadata
@@ -7,34 +8,43 @@ import calendar
 import typer
 import typer.completion
 from datetime import datetime
-from rich import print
-from rich.table import Table
-from rich.panel import Panel
-from rich import box
 from typing import Annotated, Optional
 from .local_db import LocalDatabase
+from . import journal
+from . import sync
+from .output import OutputFormat, rich_print as print, write_record, write_rows
 from .utils import (
     add_entry,
     create_directories,
-    create_file,
     get_last_clock_entry,
     get_rows,
+    read_entries,
     get_sum,
     validate_month,
     get_total_day_duration,
     get_table_name,
+    snapshot,
 )
 from statistics import median
 
 CONFIG_DIR = pathlib.Path.home() / ".config/clockz"
 DATA_DIR = CONFIG_DIR / "data"
-CSV_FILE = f"{datetime.now().strftime('%B')}.csv"
-CSV_FILE_PATH = DATA_DIR / CSV_FILE
+# Commands that only append an entry, and can skip SQLite in journal mode.
+WRITE_COMMANDS = ("in", "out", "task")
+ROW_COLUMNS = ["date", "time", "action", "note"]
 
 
 app = typer.Typer(name="cxz")
 config_app = typer.Typer(name="config", help="Configuration reletad commands.")
 app.add_typer(config_app)
+sync_app = typer.Typer(name="sync", help="Sync entries between machines.")
+app.add_typer(sync_app)
+bill_app = typer.Typer(name="bill", help="Billing rates and invoices.")
+app.add_typer(bill_app)
+
+
+def _output_format(ctx: typer.Context) -> OutputFormat:
+    return (ctx.obj or {}).get("format", OutputFormat.rich)
 
 
 def get_default_table_name() -> str:
@@ -51,7 +61,9 @@ def _get_table_for_date(date: str | None) -> str:
         parsed_date = datetime.strptime(date, "%Y-%m-%d")
         month, year = str(parsed_date.month), str(parsed_date.year)
         # This creates the table if it doesn't exist, as it's called non-interactively.
-        create_db_table(month=month, year=year)
+        # Journaled entries get their table created on compaction instead.
+        if not journal.is_journal_mode():
+            create_db_table(month=month, year=year)
         return get_table_name(month, year)
     except ValueError:
         print("[red]Error: Date must be in YYYY-MM-DD format.[/red]")
@@ -154,6 +166,7 @@ def clock_task(
 
 @app.command(name="show")
 def clock_show(
+    ctx: typer.Context,
     month: str = typer.Option(str(datetime.now().strftime("%m"))),
     year: str = typer.Option(str(datetime.now().strftime("%Y"))),
 ):
@@ -163,6 +176,15 @@ def clock_show(
     month_name = calendar.month_name[int(_month)]
     title = f"Clock Records for {month_name} {_year}"
 
+    output_format = _output_format(ctx)
+    if output_format != OutputFormat.rich:
+        rows = read_entries(CONFIG_DIR, table_name)
+        if rows is None:
+            typer.echo(f"No table for {month_name} {_year}", err=True)
+            raise typer.Exit(1)
+        write_rows(output_format, ROW_COLUMNS, rows)
+        return
+
     table = get_rows(CONFIG_DIR, table_name, title=title)
     if table is None:
         print(
@@ -174,18 +196,24 @@ def clock_show(
 
 @app.command(name="sum")
 def clock_sum(
+    ctx: typer.Context,
     note: str = None,
     month: str = typer.Option(str(datetime.now().strftime("%m"))),
     year: str = typer.Option(str(datetime.now().strftime("%Y"))),
 ):
     """Summarize clocked time for a specific note."""
-    print(
-        get_sum(
-            note=note or typer.prompt("Note"),
-            config_dir=CONFIG_DIR,
-            table_name=get_table_name(month, year),
-        )
-    )
+    note = note or typer.prompt("Note")
+    table_name = get_table_name(month, year)
+    total = get_sum(note=note, config_dir=CONFIG_DIR, table_name=table_name)
+
+    output_format = _output_format(ctx)
+    if output_format == OutputFormat.rich:
+        print(total)
+    elif total.startswith("Error"):
+        typer.echo(total, err=True)
+        raise typer.Exit(1)
+    else:
+        write_record(output_format, {"table": table_name, "note": note, "total": total})
 
 
 @config_app.command("dir")
@@ -197,14 +225,25 @@ def config_dir_command():
 
 
 @config_app.command("show-tables")
-def show_tables():
+def show_tables(ctx: typer.Context):
     """
     List all tables in the database.
     """
-    with LocalDatabase.Database(database_file=f"{CONFIG_DIR}/database.db") as db:
+    output_format = _output_format(ctx)
+    with snapshot(CONFIG_DIR) as db:
+        # Change log, journal and billing bookkeeping tables are not user data.
+        all_tables = [
+            row for row in db.get_all_tables() if sync.TABLE_NAME_PATTERN.match(row[0])
+        ]
+        if output_format != OutputFormat.rich:
+            write_rows(output_format, ["name"], all_tables)
+            return
+
+        from rich.table import Table
+        from rich import box
+
         table = Table(title="Database Tables", box=box.ROUNDED)
         table.add_column("Table Name")
-        all_tables = db.get_all_tables()
         if all_tables:
             for row in all_tables:
                 table.add_row(row[0])
@@ -213,6 +252,13 @@ def show_tables():
         print(table)
 
 
+@config_app.command("compact")
+def compact_journal():
+    """Move journaled entries into the database."""
+    moved = journal.compact(CONFIG_DIR)
+    print(f"[green]Compacted {moved} journaled entries[/green]")
+
+
 @config_app.command("create-db")
 def create_db():
     """Create the local database file."""
@@ -245,7 +291,15 @@ def drop_table(month: str, year: str):
             f"You sure you want to delete all entries for the month {month}.{year}?",
             abort=True,
         )
-        if db.delete_table(table_name):
+        rows = db.read_all_rows(table_name)
+        operations = []
+        for row in rows or []:
+            operations += sync.delete_operations(table_name, row)
+        operations += sync.drop_table_operations(table_name)
+        # A missing table is an error, not something DROP TABLE IF EXISTS should hide.
+        if rows is not None and db.execute_transaction(
+            sync.logged(f"drop {table_name}", operations)
+        ):
             print(f"[green]Table {table_name} dropped[/green]")
         else:
             print(f"[red]Could not drop table [{table_name}][/red]")
@@ -293,16 +347,18 @@ def delete():
             f"Are you sure you want to delete entry {line_number}?", abort=True
         )
 
-        db.delete_row(
-            table_name,
-            "date = ? AND time = ? AND action = ? AND note = ?",
-            (date, time, action, note),
+        db.execute_transaction(
+            sync.logged(
+                f"delete {action} '{note}' at {date} {time}",
+                sync.delete_operations(table_name, (date, time, action, note)),
+            )
         )
         print(f"[green]Entry {line_number} deleted successfully.[/green]")
 
 
 @app.command()
 def status(
+    ctx: typer.Context,
     prompt: Annotated[
         bool,
         typer.Option(
@@ -317,8 +373,9 @@ def status(
     today_str = datetime.now().strftime("%Y-%m-%d")
     table_name = get_default_table_name()
 
-    last_entry = get_last_clock_entry(today_str, CONFIG_DIR, table_name)
-    total_duration = get_total_day_duration(today_str, CONFIG_DIR, table_name)
+    with snapshot(CONFIG_DIR) as db:
+        last_entry = get_last_clock_entry(today_str, CONFIG_DIR, table_name, db)
+        total_duration = get_total_day_duration(today_str, CONFIG_DIR, table_name, db)
 
     total_seconds = int(total_duration.total_seconds())
     hours, remainder = divmod(total_seconds, 3600)
@@ -350,6 +407,23 @@ def status(
                 f"Total time today: [bold yellow]{duration_str}[/bold yellow]"
             )
 
+    output_format = _output_format(ctx)
+    if output_format != OutputFormat.rich:
+        _, time, action, note = last_entry or (None, None, None, None)
+        write_record(
+            output_format,
+            {
+                "date": today_str,
+                "state": action or "none",
+                "time": time,
+                "note": note,
+                "total": duration_str,
+            },
+        )
+        return
+
+    from rich.panel import Panel
+
     if not last_entry:
         panel_text = "You are [bold yellow]Not clocked in.[/bold yellow]\nNo entries found for today."
         print(
@@ -423,19 +497,336 @@ def edit_table(
 
         with open(temp_file.name, "r") as updated_file:
             updated_rows = [
-                line.strip().split("\t") for line in updated_file.readlines()
+                line.strip().split("\t")
+                for line in updated_file.readlines()
+                if line.strip()
             ]
 
-        db.delete_table(table_name)
-        db.create_table(
-            table_name, ["date TEXT", "time TEXT", "action TEXT", "note TEXT"]
-        )
-        for row in updated_rows:
-            db.insert_row(table_name, row)
+        invalid = [
+            str(number)
+            for number, row in enumerate(updated_rows, start=1)
+            if len(row) != len(sync.TABLE_COLUMNS)
+        ]
+        if invalid:
+            print(
+                f"[red]Error: Lines {', '.join(invalid)} need date, time, action and "
+                f"note separated by tabs. Nothing was changed, your edits are in "
+                f"{temp_file.name}.[/red]"
+            )
+            raise typer.Exit(1)
+
+        # Only the rows that changed are written, so the change log stays small.
+        if not db.execute_transaction(
+            sync.logged(
+                f"edit {table_name}",
+                sync.diff_operations(table_name, reader, updated_rows),
+            )
+        ):
+            print(
+                f"[red]Error: Could not update {table_name}, nothing was changed. "
+                f"Your edits are in {temp_file.name}.[/red]"
+            )
+            raise typer.Exit(1)
 
         print(f"[green]Table {table_name} updated[/green]")
 
 
+@app.command("undo")
+def undo():
+    """Revert the last change: an entry, delete, edit, import or fix."""
+    from . import history
+
+    description, succeeded = history.undo(CONFIG_DIR)
+    if description is None:
+        print("Nothing to undo.")
+    elif succeeded:
+        print(f"[green]Undid: {description}[/green]")
+    else:
+        print(f"[red]Could not undo: {description}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command("redo")
+def redo():
+    """Reapply the last undone change."""
+    from . import history
+
+    description, succeeded = history.redo(CONFIG_DIR)
+    if description is None:
+        print("Nothing to redo.")
+    elif succeeded:
+        print(f"[green]Redid: {description}[/green]")
+    else:
+        print(f"[red]Could not redo: {description}[/red]")
+        raise typer.Exit(1)
+
+
+@app.command("doctor")
+def doctor(
+    ctx: typer.Context,
+    fix: Annotated[
+        bool, typer.Option("--fix", help="Fix what can be fixed in one transaction.")
+    ] = False,
+):
+    """Check all months for unmatched, duplicate and malformed entries."""
+    from . import doctor as checks
+
+    issues, operations = checks.scan(CONFIG_DIR)
+
+    output_format = _output_format(ctx)
+    if output_format != OutputFormat.rich:
+        write_rows(
+            output_format,
+            ["kind", "table", "rowid", *ROW_COLUMNS, "detail", "fixable"],
+            (
+                (
+                    issue.kind,
+                    issue.table,
+                    issue.rowid,
+                    *issue.row,
+                    issue.detail,
+                    issue.fixable,
+                )
+                for issue in issues
+            ),
+        )
+    elif not issues:
+        print("[green]No issues found.[/green]")
+    else:
+        from rich.table import Table
+        from rich import box
+
+        table = Table(title="Doctor", box=box.ROUNDED)
+        for column in ("Issue", "Row", "Date", "Time", "Action", "Note", "Detail"):
+            table.add_column(column)
+        for issue in issues:
+            kind = (
+                f"[yellow]{issue.kind}[/yellow]"
+                if issue.fixable
+                else f"[red]{issue.kind}[/red]"
+            )
+            row_ref = f"{issue.table.removeprefix('data_')}#{issue.rowid}"
+            table.add_row(kind, row_ref, *map(str, issue.row), issue.detail)
+        print(table)
+        print(
+            f"{len(issues)} issues, {sum(issue.fixable for issue in issues)} fixable"
+            " ([yellow]yellow[/yellow]) with --fix."
+        )
+
+    if fix and operations:
+        if not checks.fix(CONFIG_DIR, operations):
+            typer.echo("Fixing failed, nothing was changed.", err=True)
+            raise typer.Exit(1)
+        if output_format == OutputFormat.rich:
+            print("[green]Fixed.[/green]")
+
+
+@app.command("watch")
+def watch(
+    idle_minutes: Annotated[
+        int, typer.Option(help="Minutes without input before clocking out.")
+    ] = 10,
+    source: Annotated[
+        str, typer.Option(help="Input source: auto, pynput or evdev.")
+    ] = "auto",
+):
+    """Clock out automatically while idle, and back in on activity."""
+    from .activity import ActivityMonitor, AutoClockOut, get_source
+
+    try:
+        input_source = get_source(source)
+    except ValueError as e:
+        print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    except ImportError:
+        print(
+            "[red]Idle detection needs extra packages: pip install 'cloxz\\[idle]'[/red]"
+        )
+        raise typer.Exit(1)
+    except OSError as e:
+        print(
+            f"[red]Could not read input devices: {e}[/red]\n"
+            "Reading /dev/input needs access to its devices, usually through the "
+            "'input' group: sudo usermod -aG input $USER, then log in again."
+        )
+        raise typer.Exit(1)
+
+    monitor = ActivityMonitor(AutoClockOut(CONFIG_DIR), idle_after=idle_minutes * 60)
+    print(f"Watching for {idle_minutes} minutes of inactivity, Ctrl+C to stop.")
+    try:
+        monitor.run(input_source)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+
+
+@sync_app.command("export")
+def sync_export(
+    output: Annotated[
+        str,
+        typer.Option("--output", "-o", help="File to write the delta to."),
+    ] = "cxz-delta.json",
+    since: Annotated[
+        int,
+        typer.Option(help="Export changes after this sequence number."),
+    ] = 0,
+):
+    """Export changes made since a sequence number to a delta file."""
+    try:
+        count, last_seq = sync.export_delta(CONFIG_DIR, output, since)
+    except OSError as error:
+        print(f"[red]Error: Could not write {output}: {error.strerror}[/red]")
+        raise typer.Exit(1)
+    print(f"[green]Exported {count} changes to {output}[/green]")
+    print(f"Next time run with [bold]--since {last_seq}[/bold]")
+
+
+@sync_app.command("apply")
+def sync_apply(delta_file: str = typer.Argument(..., help="Delta file to merge.")):
+    """Merge a delta file exported on another machine."""
+    try:
+        applied, skipped, conflicts = sync.apply_delta(CONFIG_DIR, delta_file)
+    except OSError as error:
+        print(f"[red]Error: Could not read {delta_file}: {error.strerror}[/red]")
+        raise typer.Exit(1)
+    except (json.JSONDecodeError, KeyError, TypeError):
+        print(f"[red]Error: {delta_file} is not a cxz delta file.[/red]")
+        raise typer.Exit(1)
+    print(f"[green]Applied {applied} changes, skipped {skipped}.[/green]")
+    for conflict in conflicts:
+        print(f"[red]Conflict: {conflict}[/red]")
+
+
+@bill_app.command("rate")
+def bill_rate(
+    pattern: str = typer.Argument(
+        ..., help="Note to bill, or a glob such as 'acme*' for a whole project."
+    ),
+    client: Annotated[str, typer.Option(help="Client to invoice.")] = None,
+    rate: Annotated[float, typer.Option(help="Hourly rate.")] = None,
+    round_to: Annotated[
+        int, typer.Option("--round", help="Round each session up to N minutes.")
+    ] = 1,
+    minimum: Annotated[
+        int, typer.Option(help="Minimum minutes charged per session.")
+    ] = 0,
+    overtime_after: Annotated[
+        float, typer.Option(help="Daily hours per client before overtime applies.")
+    ] = 0,
+    overtime_multiplier: Annotated[
+        float, typer.Option(help="Rate multiplier for overtime.")
+    ] = 1.5,
+    remove: Annotated[bool, typer.Option("--remove", help="Remove the rule.")] = False,
+):
+    """Set or remove the billing rule for a note or project."""
+    from . import billing
+
+    if remove:
+        billing.remove_rule(CONFIG_DIR, pattern)
+        print(f"[green]Removed rule for {pattern}[/green]")
+        return
+
+    client = client or typer.prompt("Client")
+    rate = rate if rate is not None else typer.prompt("Hourly rate", type=float)
+    rule = billing.Rule(
+        pattern, client, rate, round_to, minimum, overtime_after, overtime_multiplier
+    )
+    if billing.set_rule(CONFIG_DIR, rule):
+        print(f"[green]Billing {pattern} to {client} at {rate:g}/h[/green]")
+    else:
+        print("[red]Could not save the billing rule[/red]")
+        raise typer.Exit(1)
+
+
+@bill_app.command("rates")
+def bill_rates(ctx: typer.Context):
+    """List billing rules."""
+    from . import billing
+
+    rules = billing.get_rules(CONFIG_DIR)
+    output_format = _output_format(ctx)
+    if output_format != OutputFormat.rich:
+        write_rows(output_format, list(billing.Rule._fields), rules)
+        return
+
+    from rich.table import Table
+    from rich import box
+
+    table = Table(title="Billing Rules", box=box.ROUNDED)
+    for column in ("Note", "Client", "Rate", "Round", "Minimum", "Overtime"):
+        table.add_column(column)
+    for rule in rules:
+        overtime = (
+            f"x{rule.overtime_multiplier} after {rule.overtime_after}h"
+            if rule.overtime_after
+            else "-"
+        )
+        table.add_row(
+            rule.pattern,
+            rule.client,
+            f"{rule.rate:g}",
+            f"{rule.increment}m",
+            f"{rule.minimum}m",
+            overtime,
+        )
+    print(table)
+
+
+@bill_app.command("invoice")
+def bill_invoice(
+    ctx: typer.Context,
+    start: Annotated[
+        datetime, typer.Option(formats=["%Y-%m-%d"], help="First day to bill.")
+    ] = datetime.now().replace(day=1),
+    end: Annotated[
+        datetime, typer.Option(formats=["%Y-%m-%d"], help="Last day to bill.")
+    ] = datetime.now(),
+):
+    """Invoice line items per client for sessions in a date range."""
+    from . import billing
+
+    items = billing.invoice(CONFIG_DIR, start.date(), end.date())
+
+    output_format = _output_format(ctx)
+    if output_format != OutputFormat.rich:
+        write_rows(output_format, list(billing.LineItem._fields), items)
+        return
+
+    from rich.table import Table
+    from rich import box
+
+    title = f"Invoice {start.date()} to {end.date()}"
+    table = Table(title=title, box=box.ROUNDED)
+    for column in ("Client", "Note", "Sessions", "Worked", "Billed", "Amount"):
+        table.add_column(column)
+    client_total = None
+    for i, item in enumerate(items):
+        worked = f"{item.minutes // 60}:{item.minutes % 60:02d}"
+        billed = f"{item.billed_minutes // 60}:{item.billed_minutes % 60:02d}"
+        if item.overtime_minutes:
+            billed += f" ({item.overtime_minutes}m overtime)"
+        table.add_row(
+            item.client,
+            item.note,
+            str(item.sessions),
+            worked,
+            billed,
+            f"{item.amount:.2f}",
+        )
+        client_total = (client_total or 0) + item.amount
+        if i + 1 == len(items) or items[i + 1].client != item.client:
+            table.add_row(
+                "",
+                "[bold]Total[/bold]",
+                "",
+                "",
+                "",
+                f"[bold]{client_total:.2f}[/bold]",
+                end_section=True,
+            )
+            client_total = None
+    print(table)
+
+
 def _version_callback(value: bool) -> None:
     if value:
         try:
@@ -447,6 +838,7 @@ def _version_callback(value: bool) -> None:
 
 @app.callback()
 def main(
+    ctx: typer.Context,
     version: Optional[bool] = typer.Option(
         None,
         "--version",
@@ -454,11 +846,24 @@ def main(
         help="Show the app's version.",
         callback=_version_callback,
         is_eager=True,
-    )
+    ),
+    output_format: Annotated[
+        OutputFormat,
+        typer.Option(
+            "--format",
+            "-f",
+            envvar="CXZ_FORMAT",
+            help="Output format for reports and listings.",
+        ),
+    ] = OutputFormat.rich,
 ) -> None:
+    ctx.obj = {"format": output_format}
     create_directories(CONFIG_DIR, DATA_DIR)
-    if not os.path.exists(CSV_FILE_PATH):
-        create_file(CSV_FILE_PATH)
+    if ctx.invoked_subcommand in WRITE_COMMANDS and journal.is_journal_mode():
+        return
+    # Fold the journal in before reading; `config compact` does it explicitly.
+    if ctx.invoked_subcommand != "config":
+        journal.compact(CONFIG_DIR)
     # The create_db() call is redundant.
     # Always ensure the table for the current month exists on startup.
     create_db_table(
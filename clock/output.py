@@ -0,0 +1,55 @@
+import json
+import sys
+from enum import Enum
+
+
+class OutputFormat(str, Enum):
+    rich = "rich"
+    json = "json"
+    tsv = "tsv"
+    plain = "plain"
+
+
+def rich_print(*objects, **kwargs) -> None:
+    """rich's print, imported on first use so machine formats never load rich."""
+    from rich import print as _print
+
+    _print(*objects, **kwargs)
+
+
+def _tsv_field(value) -> str:
+    if value is None:
+        return ""
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def write_rows(output_format: str, columns: list, rows, stream=None) -> None:
+    """Streams rows to stream one line at a time, without building a table first."""
+    write = (stream or sys.stdout).write
+    match output_format:
+        case OutputFormat.json:
+            write("[")
+            for i, row in enumerate(rows):
+                write(("," if i else "") + json.dumps(dict(zip(columns, row))))
+            write("]\n")
+        case OutputFormat.tsv:
+            write("\t".join(columns) + "\n")
+            for row in rows:
+                write("\t".join(_tsv_field(value) for value in row) + "\n")
+        case _:
+            for row in rows:
+                write("  ".join(str(value) for value in row) + "\n")
+
+
+def write_record(output_format: str, record: dict, stream=None) -> None:
+    """Writes a single record, e.g. a status or a sum."""
+    write = (stream or sys.stdout).write
+    match output_format:
+        case OutputFormat.json:
+            write(json.dumps(record) + "\n")
+        case OutputFormat.tsv:
+            write("\t".join(record) + "\n")
+            write("\t".join(_tsv_field(value) for value in record.values()) + "\n")
+        case _:
+            for key, value in record.items():
+                write(f"{key}: {'' if value is None else value}\n")
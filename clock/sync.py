@@ -0,0 +1,300 @@
+import json
+import platform
+import re
+import uuid
+from collections import Counter
+from .local_db import LocalDatabase
+
+CHANGES_TABLE = "change_log"
+OPERATIONS_TABLE = "operation_log"
+TABLE_COLUMNS = ["date TEXT", "time TEXT", "action TEXT", "note TEXT"]
+TABLE_NAME_PATTERN = re.compile(r"^data_\d{4}_\d{2}$")
+ROW_MATCH = "date = ? AND time = ? AND action = ? AND note = ?"
+
+
+def changes_table_operation() -> tuple:
+    """The (query, params) pair creating the change log if it is missing."""
+    return (
+        f"""CREATE TABLE IF NOT EXISTS {CHANGES_TABLE} (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            change_id TEXT UNIQUE,
+            origin TEXT,
+            table_name TEXT,
+            row_id INTEGER,
+            op TEXT,
+            date TEXT,
+            time TEXT,
+            action TEXT,
+            note TEXT
+        )""",
+        (),
+    )
+
+
+def operations_table_operation() -> tuple:
+    """The (query, params) pair creating the operation log if it is missing.
+
+    Each operation groups the change log rows of one user-level mutation, in the
+    range (from_seq, to_seq], which is what undo and redo replay.
+    """
+    return (
+        f"""CREATE TABLE IF NOT EXISTS {OPERATIONS_TABLE} (
+            op_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            description TEXT,
+            from_seq INTEGER,
+            to_seq INTEGER,
+            state TEXT DEFAULT 'done'
+        )""",
+        (),
+    )
+
+
+def create_table_operation(table_name: str) -> tuple:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {table_name} ({', '.join(TABLE_COLUMNS)})",
+        (),
+    )
+
+
+def logged(description: str, operations: list) -> list:
+    """Wraps operations so their logged changes can be undone as one step."""
+    if not operations:
+        return []
+    return [
+        changes_table_operation(),
+        operations_table_operation(),
+        # A new mutation makes the undone ones unreachable for redo.
+        (
+            f"UPDATE {OPERATIONS_TABLE} SET state = 'discarded' WHERE state = 'undone'",
+            (),
+        ),
+        (
+            f"""INSERT INTO {OPERATIONS_TABLE} (description, from_seq)
+                SELECT ?, IFNULL(MAX(seq), 0) FROM {CHANGES_TABLE}""",
+            (description,),
+        ),
+        *operations,
+        (
+            f"""UPDATE {OPERATIONS_TABLE}
+                SET to_seq = (SELECT IFNULL(MAX(seq), 0) FROM {CHANGES_TABLE})
+                WHERE op_id = (SELECT MAX(op_id) FROM {OPERATIONS_TABLE})""",
+            (),
+        ),
+    ]
+
+
+def _change_row(
+    table_name: str, op: str, row: tuple, change_id: str | None, origin: str | None
+) -> tuple:
+    return (
+        change_id or uuid.uuid4().hex,
+        origin or platform.node(),
+        table_name,
+        op,
+        *row,
+    )
+
+
+def insert_operations(
+    table_name: str,
+    row: tuple,
+    change_id: str | None = None,
+    origin: str | None = None,
+) -> list:
+    """Operations inserting a row and logging it, for Database.execute_transaction."""
+    return [
+        (f"INSERT INTO {table_name} VALUES (?,?,?,?)", tuple(row)),
+        (
+            f"""INSERT INTO {CHANGES_TABLE}
+                (change_id, origin, table_name, op, date, time, action, note, row_id)
+                VALUES (?,?,?,?,?,?,?,?, last_insert_rowid())""",
+            _change_row(table_name, "insert", row, change_id, origin),
+        ),
+    ]
+
+
+def delete_operations(
+    table_name: str,
+    row: tuple,
+    change_id: str | None = None,
+    origin: str | None = None,
+) -> list:
+    """Operations deleting one matching row and logging it."""
+    row_id = f"(SELECT rowid FROM {table_name} WHERE {ROW_MATCH} LIMIT 1)"
+    return [
+        # Logged first, so the rowid is looked up before the row is gone.
+        (
+            f"""INSERT INTO {CHANGES_TABLE}
+                (change_id, origin, table_name, op, date, time, action, note, row_id)
+                VALUES (?,?,?,?,?,?,?,?, {row_id})""",
+            _change_row(table_name, "delete", row, change_id, origin) + tuple(row),
+        ),
+        (f"DELETE FROM {table_name} WHERE rowid = {row_id}", tuple(row)),
+    ]
+
+
+def drop_table_operations(
+    table_name: str,
+    change_id: str | None = None,
+    origin: str | None = None,
+) -> list:
+    """Operations dropping an emptied table and logging it, so redo can repeat it."""
+    return [
+        (
+            f"""INSERT INTO {CHANGES_TABLE} (change_id, origin, table_name, op)
+                VALUES (?,?,?,?)""",
+            _change_row(table_name, "drop", (), change_id, origin),
+        ),
+        (f"DROP TABLE IF EXISTS {table_name}", ()),
+    ]
+
+
+def diff_operations(table_name: str, old_rows: list, new_rows: list) -> list:
+    """Operations turning old_rows into new_rows, touching only the rows that differ."""
+    old_counts = Counter(tuple(row) for row in old_rows)
+    new_counts = Counter(tuple(row) for row in new_rows)
+    operations = []
+    for row, count in (old_counts - new_counts).items():
+        for _ in range(count):
+            operations += delete_operations(table_name, row)
+    for row, count in (new_counts - old_counts).items():
+        for _ in range(count):
+            operations += insert_operations(table_name, row)
+    return operations
+
+
+def export_delta(config_dir: str, path: str, since: int = 0) -> tuple[int, int]:
+    """Writes changes after sequence `since` to path, returns (count, last seq)."""
+    with LocalDatabase.Database(
+        database_file=f"{config_dir}/database.db", read_only=True
+    ) as db:
+        # None when nothing was ever logged and the table doesn't exist yet.
+        rows = db.execute_query(
+            f"""SELECT seq, change_id, origin, table_name, op, date, time, action, note
+                FROM {CHANGES_TABLE} WHERE seq > ? ORDER BY seq""",
+            (since,),
+        )
+    rows = rows or []
+    keys = (
+        "seq",
+        "change_id",
+        "origin",
+        "table",
+        "op",
+        "date",
+        "time",
+        "action",
+        "note",
+    )
+    changes = [dict(zip(keys, row)) for row in rows]
+    last_seq = changes[-1]["seq"] if changes else since
+    with open(path, "w") as delta_file:
+        json.dump(
+            {"since": since, "last_seq": last_seq, "changes": changes}, delta_file
+        )
+    return len(changes), last_seq
+
+
+def apply_delta(config_dir: str, path: str) -> tuple[int, int, list[str]]:
+    """Merges a delta file into the database in one transaction.
+
+    Changes already known by id, or whose insert is already present, are skipped,
+    so applying the same delta twice is harmless. Returns (applied, skipped,
+    conflicts), conflicts being changes that were left out.
+    """
+    with open(path, "r") as delta_file:
+        changes = json.load(delta_file)["changes"]
+
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        db.execute_transaction([changes_table_operation()])
+        known_ids = {
+            row[0]
+            for row in db.execute_query(f"SELECT change_id FROM {CHANGES_TABLE}") or []
+        }
+        existing_tables = {row[0] for row in db.get_all_tables()}
+        table_rows = {}
+        # Rows that were local before this apply, the only ones a change can clash with.
+        local_rows = {}
+
+        operations = []
+        applied, skipped, conflicts = 0, 0, []
+        for change in changes:
+            table_name = change["table"]
+            row = (change["date"], change["time"], change["action"], change["note"])
+            if not TABLE_NAME_PATTERN.match(table_name):
+                conflicts.append(f"{change['change_id']}: invalid table {table_name}")
+                continue
+            if change["change_id"] in known_ids:
+                skipped += 1
+                continue
+
+            if table_name not in table_rows:
+                if table_name in existing_tables:
+                    table_rows[table_name] = Counter(db.read_all_rows(table_name) or [])
+                else:
+                    table_rows[table_name] = Counter()
+                    operations.append(create_table_operation(table_name))
+                local_rows[table_name] = table_rows[table_name].copy()
+            rows, local = table_rows[table_name], local_rows[table_name]
+
+            if change["op"] == "insert":
+                if rows[row]:
+                    skipped += 1
+                    continue
+                # Clocking in (or out) at the same minute for another note contradicts
+                # a local entry, an out followed by an in is just a switch.
+                clash = row[2] != "task" and next(
+                    (
+                        r
+                        for r in local
+                        if local[r] and r[:3] == row[:3] and r[3] != row[3]
+                    ),
+                    None,
+                )
+                if clash:
+                    conflicts.append(
+                        f"{change['change_id']}: {row[2]} '{row[3]}' at {row[0]} {row[1]}"
+                        f" clashes with local {clash[2]} '{clash[3]}'"
+                    )
+                    continue
+                operations += insert_operations(
+                    table_name, row, change["change_id"], change["origin"]
+                )
+                rows[row] += 1
+            elif change["op"] == "delete":
+                if not rows[row]:
+                    conflicts.append(
+                        f"{change['change_id']}: {row[2]} '{row[3]}' at {row[0]} {row[1]}"
+                        " was already deleted or edited locally"
+                    )
+                    continue
+                operations += delete_operations(
+                    table_name, row, change["change_id"], change["origin"]
+                )
+                rows[row] -= 1
+                if local[row]:
+                    local[row] -= 1
+            elif change["op"] == "drop":
+                if +rows:
+                    conflicts.append(
+                        f"{change['change_id']}: {table_name} still has local entries"
+                        " and was not dropped"
+                    )
+                    continue
+                operations += drop_table_operations(
+                    table_name, change["change_id"], change["origin"]
+                )
+                # Later changes to this table start over from a new, empty one.
+                del table_rows[table_name], local_rows[table_name]
+                existing_tables.discard(table_name)
+            else:
+                conflicts.append(f"{change['change_id']}: unknown op {change['op']}")
+                continue
+            known_ids.add(change["change_id"])
+            applied += 1
+
+        if operations and not db.execute_transaction(
+            logged(f"sync apply {path}", operations)
+        ):
+            return 0, skipped, conflicts + ["Transaction failed, nothing was applied"]
+    return applied, skipped, conflicts
@@ -3,10 +3,11 @@ import calendar
 import os
 import typer
 from enum import Enum
-from rich.table import Table
-from rich import box
+from contextlib import nullcontext
 from statistics import median
 from .local_db import LocalDatabase
+from . import journal
+from . import sync
 
 
 def create_directories(config_dir: str, data_dir: str):
@@ -63,48 +64,83 @@ def add_entry(
     entry_date = date or datetime.now().strftime("%Y-%m-%d")
     entry_time = time or datetime.now().strftime("%H:%M")
 
+    if journal.is_journal_mode():
+        journal.append_event(
+            config_dir, table_name, entry_date, entry_time, action, note
+        )
+        return
+
     with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
-        db.insert_row(
-            table_name,
-            (entry_date, entry_time, action, note),
+        db.execute_transaction(
+            sync.logged(
+                f"{action} '{note}' at {entry_date} {entry_time}",
+                sync.insert_operations(
+                    table_name, (entry_date, entry_time, action, note)
+                ),
+            )
         )
 
 
+def snapshot(config_dir: str) -> LocalDatabase.Database:
+    """A read-only connection that sees one consistent state for all its reads."""
+    return LocalDatabase.Database(
+        database_file=f"{config_dir}/database.db", read_only=True
+    )
+
+
+def read_entries(
+    config_dir: str, table_name: str, db: LocalDatabase.Database | None = None
+) -> list | None:
+    """Reads a table's rows merged with any journaled entries not yet compacted."""
+    with nullcontext(db) if db else snapshot(config_dir) as db:
+        rows = db.read_all_rows(table_name)
+    pending = journal.read_pending(config_dir, table_name)
+    if not pending:
+        return rows
+    return sorted((rows or []) + pending, key=lambda row: (row[0], row[1]))
+
+
 def get_rows(
     config_dir: str, table_name: str, print_line_num: bool = False, title: str = None
 ):
-    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
-        rows = db.read_all_rows(table_name)
-        if rows is None:
-            return None
+    from rich.table import Table
+    from rich import box
+
+    rows = read_entries(config_dir, table_name)
+    if rows is None:
+        return None
 
-        table = Table(title=title, box=box.ROUNDED)
+    table = Table(title=title, box=box.ROUNDED)
+    if print_line_num:
+        table.add_column("")
+    table.add_column("Date")
+    table.add_column("Time")
+    table.add_column("Action")
+    table.add_column("Note")
+    for i, row in enumerate(rows, start=1):
+        date, time, action, note = row
+        match action:
+            case "in":
+                action = "[green]in[/green]"
+            case "out":
+                action = "[red]out[/red]"
+            case "task":
+                action = "[blue]task[/blue]"
         if print_line_num:
-            table.add_column("")
-        table.add_column("Date")
-        table.add_column("Time")
-        table.add_column("Action")
-        table.add_column("Note")
-        for i, row in enumerate(rows, start=1):
-            date, time, action, note = row
-            match action:
-                case "in":
-                    action = "[green]in[/green]"
-                case "out":
-                    action = "[red]out[/red]"
-                case "task":
-                    action = "[blue]task[/blue]"
-            if print_line_num:
-                table.add_row(str(i), date, time, action, note)
-            else:
-                table.add_row(date, time, action, note)
-        return table
-
-
-def get_last_clock_entry(date: str, config_dir: str, table_name: str) -> tuple | None:
+            table.add_row(str(i), date, time, action, note)
+        else:
+            table.add_row(date, time, action, note)
+    return table
+
+
+def get_last_clock_entry(
+    date: str,
+    config_dir: str,
+    table_name: str,
+    db: LocalDatabase.Database | None = None,
+) -> tuple | None:
     """Fetches the last 'in' or 'out' entry for a given date."""
-    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
-        entries = db.read_all_rows(table_name)
+    entries = read_entries(config_dir, table_name, db)
     if not entries:
         return None
 
@@ -116,10 +152,14 @@ def get_last_clock_entry(date: str, config_dir: str, table_name: str) -> tuple |
     return day_entries[-1] if day_entries else None
 
 
-def get_total_day_duration(date: str, config_dir: str, table_name: str) -> timedelta:
+def get_total_day_duration(
+    date: str,
+    config_dir: str,
+    table_name: str,
+    db: LocalDatabase.Database | None = None,
+) -> timedelta:
     """Calculates the total clocked duration for a given day."""
-    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
-        entries = db.read_all_rows(table_name)
+    entries = read_entries(config_dir, table_name, db)
     if not entries:
         return timedelta(0)
 
@@ -147,7 +187,7 @@ def get_total_day_duration(date: str, config_dir: str, table_name: str) -> timed
 
 
 def get_sum(note: str, config_dir: str, table_name: str) -> str:
-    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+    with snapshot(config_dir) as db:
         # Check if the number of clock-ins and clock-outs are equal
         check_query = f"""
             SELECT
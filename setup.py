@@ -5,6 +5,9 @@ setup(
     version="0.7.0",
     packages=find_packages(),
     install_requires=["typer", "rich"],
+    extras_require={
+        "idle": ["pynput", "evdev; platform_system == 'Linux'"],
+    },
     entry_points={
         "console_scripts": [
             "cxz=clock.main:app",
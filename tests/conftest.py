@@ -0,0 +1,48 @@
+import pytest
+
+from clock import main, sync
+from clock.local_db import LocalDatabase
+
+TABLE = "data_2024_03"
+
+
+@pytest.fixture
+def write_logged():
+    """Runs operations in one logged transaction, the way commands write."""
+
+    def write(config_dir, operations):
+        with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+            assert db.execute_transaction(sync.logged("test", operations))
+
+    return write
+
+
+@pytest.fixture
+def insert_rows(write_logged):
+    """Inserts rows into a monthly table, creating it if needed."""
+
+    def insert(config_dir, *rows, table_name=TABLE):
+        operations = [sync.create_table_operation(table_name)]
+        for row in rows:
+            operations += sync.insert_operations(table_name, row)
+        write_logged(config_dir, operations)
+
+    return insert
+
+
+@pytest.fixture
+def read_rows():
+    """Reads a monthly table in insertion order."""
+
+    def read(config_dir, table_name=TABLE):
+        with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+            return db.execute_query(f"SELECT * FROM {table_name} ORDER BY rowid")
+
+    return read
+
+
+@pytest.fixture
+def config_dir(tmp_path, monkeypatch):
+    """Points the cxz commands at an empty config directory."""
+    monkeypatch.setattr(main, "CONFIG_DIR", tmp_path)
+    return tmp_path
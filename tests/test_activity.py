@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from clock.activity import ACTIVE, IDLE, ActivityMonitor, InputSource, ReplaySource
+
+
+class Stop(Exception):
+    pass
+
+
+class DelayedSource(InputSource):
+    """Delivers one event from another thread once run() is already waiting."""
+
+    def __init__(self, timestamp: float) -> None:
+        self.timestamp = timestamp
+
+    def start(self, callback) -> None:
+        def deliver():
+            time.sleep(0.1)
+            callback(self.timestamp)
+
+        threading.Thread(target=deliver, daemon=True).start()
+
+    def stop(self) -> None:
+        pass
+
+
+def test_replay_reports_idle_then_active():
+    flushed = []
+    monitor = ActivityMonitor(flushed.append, idle_after=600, flush_after=3600)
+
+    ReplaySource([60, 90, 60 * 30]).replay(monitor)
+
+    assert flushed == [
+        [(IDLE, datetime.fromtimestamp(60)), (ACTIVE, datetime.fromtimestamp(1800))]
+    ]
+    assert list(monitor.history) == [(1, 2)]
+
+
+def test_run_wakes_up_for_the_first_event():
+    flushed = []
+
+    def on_flush(transitions):
+        flushed.append(transitions)
+        raise Stop
+
+    monitor = ActivityMonitor(on_flush, idle_after=600, flush_after=0)
+    errors = []
+
+    def run():
+        try:
+            # An event long ago is already past its idle deadline.
+            monitor.run(DelayedSource(60))
+        except Stop as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert flushed == [[(IDLE, datetime.fromtimestamp(60))]]
+
+
+def test_input_sources_must_implement_start_and_stop():
+    class Partial(InputSource):
+        def start(self, callback) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_record_waits_for_advance_to_release_the_lock():
+    monitor = ActivityMonitor(lambda transitions: None, idle_after=600)
+    monitor.record(60)
+
+    with monitor._lock:
+        # A listener thread delivering an event while advance() is going idle.
+        listener = threading.Thread(target=monitor.record, args=(60 * 30,))
+        listener.start()
+        listener.join(timeout=0.1)
+        assert listener.is_alive()
+        monitor.idle = True
+        monitor._queue(IDLE, 1)
+    listener.join(timeout=5)
+
+    assert [state for state, _ in monitor.pending] == [IDLE, ACTIVE]
+    assert not monitor.idle
@@ -0,0 +1,39 @@
+from datetime import date
+
+from clock import billing
+
+
+def test_cached_month_sees_a_session_closed_next_month(tmp_path, insert_rows):
+    billing.set_rule(tmp_path, billing.Rule("work", "acme", 60))
+    insert_rows(
+        tmp_path, ("2024-01-31", "22:00", "in", "work"), table_name="data_2024_01"
+    )
+    insert_rows(
+        tmp_path, ("2024-02-10", "09:00", "in", "other"), table_name="data_2024_02"
+    )
+    january = (tmp_path, date(2024, 1, 1), date(2024, 1, 31), date(2024, 6, 1))
+
+    assert billing.invoice(*january) == []
+
+    insert_rows(
+        tmp_path, ("2024-02-01", "01:00", "out", "work"), table_name="data_2024_02"
+    )
+
+    assert billing.invoice(*january) == [
+        billing.LineItem("acme", "work", 1, 180, 180, 0, 180.0)
+    ]
+
+
+def test_resumed_session_is_billed_as_two_sessions(tmp_path, insert_rows):
+    billing.set_rule(tmp_path, billing.Rule("work", "acme", 60, minimum=30))
+    insert_rows(
+        tmp_path,
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "10:00", "out", "work"),
+        ("2024-03-04", "10:00", "in", "work"),
+        ("2024-03-04", "12:00", "out", "work"),
+    )
+
+    assert billing.invoice(
+        tmp_path, date(2024, 3, 1), date(2024, 3, 31), date(2024, 6, 1)
+    ) == [billing.LineItem("acme", "work", 2, 180, 180, 0, 180.0)]
@@ -0,0 +1,99 @@
+from clock import doctor
+
+
+def test_same_minute_out_and_in_is_a_clean_resume(tmp_path, insert_rows, read_rows):
+    rows = [
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "10:00", "out", "work"),
+        ("2024-03-04", "10:00", "in", "work"),
+        ("2024-03-04", "12:00", "out", "work"),
+    ]
+    insert_rows(tmp_path, *rows)
+
+    issues, operations = doctor.scan(tmp_path, today="2024-03-05")
+
+    assert issues == []
+    assert operations == []
+    assert read_rows(tmp_path) == rows
+
+
+def test_resume_is_kept_when_its_in_was_written_first(tmp_path, insert_rows, read_rows):
+    rows = [
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "10:00", "in", "work"),
+        ("2024-03-04", "10:00", "out", "work"),
+        ("2024-03-04", "12:00", "out", "work"),
+    ]
+    insert_rows(tmp_path, *rows)
+
+    issues, operations = doctor.scan(tmp_path, today="2024-03-05")
+    assert not any(issue.fixable for issue in issues)
+    assert doctor.fix(tmp_path, operations)
+    assert read_rows(tmp_path) == rows
+
+
+def test_out_closes_the_session_with_its_note(tmp_path, insert_rows):
+    insert_rows(
+        tmp_path,
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "10:00", "in", "call"),
+        ("2024-03-04", "10:30", "out", "work"),
+        ("2024-03-04", "11:00", "in", "call"),
+    )
+
+    issues, _ = doctor.scan(tmp_path, today="2024-03-05")
+
+    kinds = [(issue.kind, issue.row[1], issue.fixable) for issue in issues]
+    assert kinds == [
+        ("double-in", "10:00", False),
+        ("double-in", "11:00", True),
+        ("unmatched-in", "10:00", False),
+    ]
+
+
+def test_duplicate_rows_are_removed(tmp_path, insert_rows, read_rows):
+    row = ("2024-03-04", "09:00", "in", "work")
+    insert_rows(tmp_path, row, row, ("2024-03-04", "10:00", "out", "work"))
+
+    issues, operations = doctor.scan(tmp_path, today="2024-03-05")
+
+    assert [issue.kind for issue in issues] == ["duplicate"]
+    assert doctor.fix(tmp_path, operations)
+    assert read_rows(tmp_path) == [row, ("2024-03-04", "10:00", "out", "work")]
+
+
+def test_month_span_split_keeps_the_session_length(tmp_path, insert_rows, read_rows):
+    insert_rows(tmp_path, ("2024-03-31", "22:00", "in", "work"))
+    insert_rows(
+        tmp_path, ("2024-04-01", "02:00", "out", "work"), table_name="data_2024_04"
+    )
+
+    issues, operations = doctor.scan(tmp_path, today="2024-04-02")
+
+    assert [(issue.kind, issue.fixable) for issue in issues] == [("month-span", True)]
+    assert doctor.fix(tmp_path, operations)
+    assert read_rows(tmp_path) == [
+        ("2024-03-31", "22:00", "in", "work"),
+        ("2024-03-31", "23:59", "out", "work"),
+    ]
+    # 119 minutes before midnight and 121 after, four hours as before.
+    assert read_rows(tmp_path, "data_2024_04") == [
+        ("2024-04-01", "00:00", "in", "work"),
+        ("2024-04-01", "02:01", "out", "work"),
+    ]
+    assert doctor.scan(tmp_path, today="2024-04-02") == ([], [])
+
+
+def test_split_of_a_session_ending_at_23_59_says_it_drops_a_minute(
+    tmp_path, insert_rows
+):
+    insert_rows(
+        tmp_path,
+        ("2024-03-04", "22:00", "in", "work"),
+        ("2024-03-05", "23:59", "out", "work"),
+    )
+
+    issues, _ = doctor.scan(tmp_path, today="2024-03-06")
+
+    assert [issue.kind for issue in issues] == ["midnight-span"]
+    assert "drops one minute" in issues[0].detail
@@ -0,0 +1,42 @@
+from clock import history, sync
+from clock.local_db import LocalDatabase
+
+TABLE = "data_2024_03"
+ROW = ("2024-03-04", "09:00", "in", "work")
+
+
+def _tables(config_dir):
+    with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+        return [row[0] for row in db.get_all_tables()]
+
+
+def test_redo_repeats_a_dropped_table(tmp_path, insert_rows, write_logged, read_rows):
+    insert_rows(tmp_path, ROW)
+    write_logged(
+        tmp_path,
+        [*sync.delete_operations(TABLE, ROW), *sync.drop_table_operations(TABLE)],
+    )
+    assert TABLE not in _tables(tmp_path)
+
+    assert history.undo(tmp_path) == ("test", True)
+    assert read_rows(tmp_path) == [ROW]
+
+    assert history.redo(tmp_path) == ("test", True)
+    assert TABLE not in _tables(tmp_path)
+
+
+def test_dropped_table_follows_through_sync(tmp_path, insert_rows, write_logged):
+    laptop, desktop = tmp_path / "laptop", tmp_path / "desktop"
+    laptop.mkdir()
+    desktop.mkdir()
+    delta = tmp_path / "delta.json"
+    insert_rows(laptop, ROW)
+    write_logged(
+        laptop,
+        [*sync.delete_operations(TABLE, ROW), *sync.drop_table_operations(TABLE)],
+    )
+
+    sync.export_delta(laptop, delta)
+
+    assert sync.apply_delta(desktop, delta) == (3, 0, [])
+    assert TABLE not in _tables(desktop)
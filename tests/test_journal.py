@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+
+from clock import history, journal
+
+
+def _append(config_dir, time):
+    journal.append_event(config_dir, "data_2024_03", "2024-03-04", time, "in", "work")
+
+
+def test_append_after_torn_line_keeps_the_entry(tmp_path, read_rows):
+    (tmp_path / "data").mkdir()
+    _append(tmp_path, "09:00")
+    with open(tmp_path / "data" / journal.JOURNAL_FILE, "a") as file:
+        file.write('{"table": "data_2024_03", "da')
+
+    _append(tmp_path, "10:00")
+
+    assert journal.read_pending(tmp_path) == [
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "10:00", "in", "work"),
+    ]
+    assert journal.compact(tmp_path) == 2
+    assert [row[1] for row in read_rows(tmp_path)] == ["09:00", "10:00"]
+
+
+def test_writer_waiting_on_compaction_moves_to_the_new_journal(tmp_path, read_rows):
+    (tmp_path / "data").mkdir()
+    _append(tmp_path, "09:00")
+    journal_path = tmp_path / "data" / journal.JOURNAL_FILE
+
+    # Hold the lock like a compaction in progress, then rename under it.
+    fd = journal._lock_journal(journal_path, os.O_RDONLY)
+    writer = threading.Thread(target=_append, args=(tmp_path, "10:00"))
+    writer.start()
+    time.sleep(0.1)  # let the writer open the old file and block on the lock
+    journal_path.rename(journal_path.with_name(f"batch{journal.COMPACTING_SUFFIX}"))
+    os.close(fd)
+    writer.join(timeout=5)
+
+    batch = journal._read_journal_file(
+        journal_path.with_name(f"batch{journal.COMPACTING_SUFFIX}")
+    )
+    assert [entry["time"] for entry in batch] == ["09:00"]
+    assert journal.compact(tmp_path) == 2
+    assert sorted(row[1] for row in read_rows(tmp_path)) == ["09:00", "10:00"]
+
+
+def test_undo_after_compaction_reverts_one_entry(tmp_path, read_rows):
+    (tmp_path / "data").mkdir()
+    _append(tmp_path, "09:00")
+    _append(tmp_path, "10:00")
+    journal.compact(tmp_path)
+
+    assert history.undo(tmp_path) == ("in 'work' at 2024-03-04 10:00", True)
+    assert [row[1] for row in read_rows(tmp_path)] == ["09:00"]
@@ -0,0 +1,37 @@
+import time
+
+from clock import sync
+from clock.local_db import LocalDatabase
+from clock.utils import snapshot
+
+TABLE = "data_2024_03"
+ROW = ("2024-03-04", "09:00", "in", "work")
+NEW_ROW = ("2024-03-04", "12:00", "out", "work")
+
+
+def _write_while_open(config_dir, read_first):
+    with snapshot(config_dir) as reader:
+        if read_first:
+            assert reader.read_all_rows(TABLE) == [ROW]
+        with LocalDatabase.Database(database_file=f"{config_dir}/database.db") as db:
+            started = time.monotonic()
+            assert db.execute_transaction(sync.insert_operations(TABLE, NEW_ROW))
+            # A blocked writer would wait out SQLite's five second busy timeout.
+            assert time.monotonic() - started < 1
+        return reader.read_all_rows(TABLE)
+
+
+def test_snapshot_does_not_see_a_commit_made_after_its_first_read(
+    tmp_path, insert_rows
+):
+    insert_rows(tmp_path, ROW)
+
+    assert _write_while_open(tmp_path, read_first=True) == [ROW]
+    with snapshot(tmp_path) as reader:
+        assert reader.read_all_rows(TABLE) == [ROW, NEW_ROW]
+
+
+def test_snapshot_is_taken_when_it_is_opened(tmp_path, insert_rows):
+    insert_rows(tmp_path, ROW)
+
+    assert _write_while_open(tmp_path, read_first=False) == [ROW]
@@ -0,0 +1,92 @@
+import pytest
+from typer.testing import CliRunner
+
+from clock import main, sync
+
+TABLE = "data_2024_03"
+ROW = ("2024-03-04", "09:00", "in", "work")
+
+
+@pytest.fixture
+def config_dir(config_dir, insert_rows):
+    insert_rows(config_dir, ROW)
+    return config_dir
+
+
+def _edit(editor):
+    return CliRunner().invoke(
+        main.app,
+        ["edit", "--month", "03", "--year", "2024", "--editor", editor],
+    )
+
+
+def test_edit_rejects_lines_without_four_fields(config_dir, read_rows):
+    result = _edit("printf '2024-03-04\\t10:00\\tin\\n' >")
+
+    assert result.exit_code == 1
+    assert "Lines 1" in result.output
+    assert "updated" not in result.output
+    assert read_rows(config_dir) == [ROW]
+
+
+def test_edit_writes_the_changed_rows(config_dir, read_rows):
+    result = _edit("printf '2024-03-04\\t10:00\\tin\\twork\\n' >")
+
+    assert result.exit_code == 0
+    assert read_rows(config_dir) == [("2024-03-04", "10:00", "in", "work")]
+
+
+def test_show_tables_hides_internal_tables(config_dir):
+    result = CliRunner().invoke(
+        main.app, ["--format", "plain", "config", "show-tables"]
+    )
+
+    assert result.exit_code == 0
+    tables = result.output.split()
+    assert TABLE in tables
+    assert all(sync.TABLE_NAME_PATTERN.match(table) for table in tables)
+
+
+@pytest.mark.parametrize("content", [None, "not json", '{"since": 0}', '["changes"]'])
+def test_sync_apply_rejects_bad_delta_files(config_dir, tmp_path, content, read_rows):
+    delta = tmp_path / "delta.json"
+    if content is not None:
+        delta.write_text(content)
+
+    result = CliRunner().invoke(main.app, ["sync", "apply", str(delta)])
+
+    assert result.exit_code == 1
+    assert "Error:" in result.output
+    assert not isinstance(result.exception, (OSError, ValueError, KeyError))
+    assert read_rows(config_dir) == [ROW]
+
+
+def test_drop_table_undo_redo(config_dir):
+    runner = CliRunner()
+
+    def tables():
+        result = runner.invoke(main.app, ["--format", "plain", "config", "show-tables"])
+        return result.output.split()
+
+    runner.invoke(main.app, ["config", "drop-table", "03", "2024"], input="y\n")
+    assert TABLE not in tables()
+    runner.invoke(main.app, ["undo"])
+    assert TABLE in tables()
+    result = runner.invoke(main.app, ["redo"])
+    assert f"Redid: drop {TABLE}" in result.output
+    assert TABLE not in tables()
+
+
+def test_watch_explains_unreadable_input_devices(config_dir, monkeypatch):
+    from clock import activity
+
+    def denied(name):
+        raise PermissionError(13, "Permission denied", "/dev/input/event0")
+
+    monkeypatch.setattr(activity, "get_source", denied)
+
+    result = CliRunner().invoke(main.app, ["watch", "--source", "evdev"])
+
+    assert result.exit_code == 1
+    assert "[Errno 13] Permission denied: '/dev/input/event0'" in result.output
+    assert "usermod -aG input" in result.output
@@ -0,0 +1,159 @@
+import io
+import json
+import subprocess
+import sys
+from datetime import datetime
+
+import pytest
+from typer.testing import CliRunner
+
+from clock import main
+from clock.output import OutputFormat, write_record, write_rows
+
+TABLE = "data_2024_03"
+ROWS = [
+    ("2024-03-04", "09:00", "in", "tab\there"),
+    ("2024-03-04", "12:30", "out", "tab\there"),
+]
+
+
+@pytest.fixture
+def config_dir(config_dir, insert_rows):
+    insert_rows(config_dir, *ROWS)
+    return config_dir
+
+
+def _run(*args):
+    return CliRunner().invoke(main.app, list(args))
+
+
+def test_write_rows_json_is_one_array():
+    stream = io.StringIO()
+
+    write_rows(OutputFormat.json, ["a", "b"], iter([(1, "x"), (2, None)]), stream)
+
+    assert json.loads(stream.getvalue()) == [{"a": 1, "b": "x"}, {"a": 2, "b": None}]
+
+
+def test_write_rows_json_without_rows_is_an_empty_array():
+    stream = io.StringIO()
+
+    write_rows(OutputFormat.json, ["a"], [], stream)
+
+    assert stream.getvalue() == "[]\n"
+
+
+def test_write_rows_tsv_escapes_separators():
+    stream = io.StringIO()
+
+    write_rows(OutputFormat.tsv, ["a", "b"], [("x\ty", "1\n2\\3"), (None, 4)], stream)
+
+    assert stream.getvalue() == "a\tb\nx\\ty\t1\\n2\\\\3\n\t4\n"
+
+
+@pytest.mark.parametrize(
+    "output_format, expected",
+    [
+        (OutputFormat.json, '{"state": "in", "note": null}\n'),
+        (OutputFormat.tsv, "state\tnote\nin\t\n"),
+        (OutputFormat.plain, "state: in\nnote: \n"),
+    ],
+)
+def test_write_record(output_format, expected):
+    stream = io.StringIO()
+
+    write_record(output_format, {"state": "in", "note": None}, stream)
+
+    assert stream.getvalue() == expected
+
+
+def test_show_json(config_dir):
+    result = _run("--format", "json", "show", "--month", "03", "--year", "2024")
+
+    assert result.exit_code == 0
+    assert json.loads(result.output) == [
+        dict(zip(main.ROW_COLUMNS, row)) for row in ROWS
+    ]
+
+
+def test_show_tsv(config_dir):
+    result = _run("--format", "tsv", "show", "--month", "03", "--year", "2024")
+
+    assert result.exit_code == 0
+    assert result.output.splitlines() == [
+        "date\ttime\taction\tnote",
+        "2024-03-04\t09:00\tin\ttab\\there",
+        "2024-03-04\t12:30\tout\ttab\\there",
+    ]
+
+
+def test_show_plain(config_dir):
+    result = _run("--format", "plain", "show", "--month", "03", "--year", "2024")
+
+    assert result.exit_code == 0
+    assert result.output.splitlines() == ["  ".join(row) for row in ROWS]
+
+
+def test_show_missing_table_fails_on_stderr(config_dir):
+    result = _run("--format", "json", "show", "--month", "01", "--year", "1999")
+
+    assert result.exit_code == 1
+    assert "No table for January 1999" in result.output
+
+
+def test_sum_formats(config_dir):
+    args = ("sum", "--note", "tab\there", "--month", "03", "--year", "2024")
+
+    record = json.loads(_run("--format", "json", *args).output)
+    tsv = _run("--format", "tsv", *args).output.splitlines()
+    plain = _run("--format", "plain", *args).output.splitlines()
+
+    assert record["table"] == TABLE
+    assert record["note"] == "tab\there"
+    assert tsv == ["table\tnote\ttotal", f"{TABLE}\ttab\\there\t{record['total']}"]
+    assert plain[:2] == [f"table: {TABLE}", "note: tab\there"]
+
+
+def test_status_formats(config_dir, insert_rows):
+    now = datetime.now()
+    insert_rows(
+        config_dir,
+        (now.strftime("%Y-%m-%d"), "00:00", "in", "today"),
+        table_name=now.strftime("data_%Y_%m"),
+    )
+
+    record = json.loads(_run("--format", "json", "status").output)
+    tsv = _run("--format", "tsv", "status").output.splitlines()
+    plain = _run("--format", "plain", "status").output.splitlines()
+
+    assert {key: record[key] for key in ("state", "time", "note")} == {
+        "state": "in",
+        "time": "00:00",
+        "note": "today",
+    }
+    assert tsv[0] == "date\tstate\ttime\tnote\ttotal"
+    assert tsv[1].split("\t")[1:4] == ["in", "00:00", "today"]
+    assert "state: in" in plain
+
+
+@pytest.mark.parametrize("command", ["show", "status", "sum --note work"])
+def test_machine_formats_never_import_rich(tmp_path, command):
+    script = f"""
+import sys
+from clock import main
+
+sys.argv = ["cxz", "--format", "json", *{command.split()!r}]
+try:
+    main.app()
+except SystemExit:
+    pass
+sys.exit("rich" in sys.modules)
+"""
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        env={"HOME": str(tmp_path), "PATH": ""},
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
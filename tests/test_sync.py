@@ -0,0 +1,80 @@
+from clock import sync
+
+TABLE = "data_2024_03"
+
+
+def _machines(tmp_path):
+    laptop, desktop = tmp_path / "laptop", tmp_path / "desktop"
+    laptop.mkdir()
+    desktop.mkdir()
+    return laptop, desktop
+
+
+def test_apply_copies_changes_and_reapplying_is_a_no_op(
+    tmp_path, insert_rows, read_rows
+):
+    laptop, desktop = _machines(tmp_path)
+    delta = tmp_path / "delta.json"
+    insert_rows(
+        laptop,
+        ("2024-03-04", "09:00", "in", "work"),
+        ("2024-03-04", "12:00", "out", "work"),
+    )
+
+    assert sync.export_delta(laptop, delta) == (2, 2)
+    assert sync.apply_delta(desktop, delta) == (2, 0, [])
+    assert read_rows(desktop) == read_rows(laptop)
+
+    assert sync.apply_delta(desktop, delta) == (0, 2, [])
+    assert read_rows(desktop) == read_rows(laptop)
+
+
+def test_deletes_follow_and_are_only_exported_once(
+    tmp_path, insert_rows, write_logged, read_rows
+):
+    laptop, desktop = _machines(tmp_path)
+    delta = tmp_path / "delta.json"
+    row = ("2024-03-04", "09:00", "in", "work")
+    insert_rows(laptop, row)
+    _, last_seq = sync.export_delta(laptop, delta)
+    sync.apply_delta(desktop, delta)
+
+    write_logged(laptop, sync.delete_operations(TABLE, row))
+
+    assert sync.export_delta(laptop, delta, since=last_seq) == (1, last_seq + 1)
+    assert sync.apply_delta(desktop, delta) == (1, 0, [])
+    assert read_rows(desktop) == []
+
+
+def test_clashing_entries_are_reported_and_left_out(tmp_path, insert_rows, read_rows):
+    laptop, desktop = _machines(tmp_path)
+    delta = tmp_path / "delta.json"
+    insert_rows(laptop, ("2024-03-04", "09:00", "in", "work"))
+    insert_rows(desktop, ("2024-03-04", "09:00", "in", "meeting"))
+
+    sync.export_delta(laptop, delta)
+    applied, skipped, conflicts = sync.apply_delta(desktop, delta)
+
+    assert (applied, skipped) == (0, 0)
+    assert len(conflicts) == 1
+    assert "clashes with local in 'meeting'" in conflicts[0]
+    assert read_rows(desktop) == [("2024-03-04", "09:00", "in", "meeting")]
+
+
+def test_switching_notes_at_the_same_minute_is_not_a_clash(
+    tmp_path, insert_rows, read_rows
+):
+    laptop, desktop = _machines(tmp_path)
+    delta = tmp_path / "delta.json"
+    rows = [
+        ("2024-03-04", "09:00", "in", "a"),
+        ("2024-03-04", "10:00", "out", "a"),
+        ("2024-03-04", "10:00", "in", "b"),
+        ("2024-03-04", "12:00", "out", "b"),
+    ]
+    insert_rows(laptop, *rows)
+
+    sync.export_delta(laptop, delta)
+
+    assert sync.apply_delta(desktop, delta) == (4, 0, [])
+    assert read_rows(desktop) == rows